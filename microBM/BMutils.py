@@ -13,19 +13,43 @@ import subprocess
 import platform
 import datetime
 import os.path
+import glob
 import re
-import sys
+import shlex
+import functools
+import concurrent.futures
 import cpuInfo
 
+# These don't change while we're running, so only ask once.
 hostName = platform.node().split(".")[0]
+systemName = platform.system()
 modelName = ""
 arch  = ""
 threadsPerCore = 1
 cores = 1
+# The machine doesn't change while we're running, so we only need to look once.
+_machineInfoCached = False
+_env = None
 
+def countCpuList(cpuList):
+    """Count the CPUs in a Linux cpu list, such as "0-3,8,10-11" """
+    count = 0
+    for item in cpuList.strip().split(","):
+        (first, _, last) = item.partition("-")
+        count += int(last) - int(first) + 1 if last else 1
+    return count
+
+def allowedCpus():
+    """Count the logical CPUs we may run on. Where we can, use our affinity
+    mask, which respects taskset and cgroup restrictions"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+@functools.lru_cache(maxsize=None)
 def capture(cmd):
     try:
-        return subprocess.run(cmd, stdout=subprocess.PIPE,shell=True).stdout.decode("utf-8")
+        return subprocess.run(shlex.split(cmd), stdout=subprocess.PIPE).stdout.decode("utf-8")
     except:
         return ""
     
@@ -34,10 +58,46 @@ def extractMachineInfo():
     This seems harder than is reasonable! /proc/cpuinfo on Arm machines
     is not as useful as it might be.
     """
-    global arch, cores, threadsPerCore, modelName
+    global arch, cores, threadsPerCore, modelName, _machineInfoCached
+
+    if _machineInfoCached:
+        return
 
-    if platform.system() == "Darwin":
+    if cpuInfo.getCoresCount():
+        # libcpuinfo has already done the work, so there's no need to run
+        # sysctl or lscpu.
+        cores = cpuInfo.getCoresCount()
+        threadsPerCore = cpuInfo.getProcessorsCount() // cores
+        # libcpuinfo reports the whole machine, but taskset or cgroups
+        # may only let us use part of it.
+        cores = min(cores, max(1, allowedCpus() // threadsPerCore))
+    elif systemName == "Darwin":
         # Extract info from sysctl
+        cores = int(capture("sysctl -n hw.physicalcpu"))
+        threads = int(capture("sysctl -n hw.logicalcpu"))
+        threadsPerCore = threads//cores
+    else:
+        # Linux...
+        # Count the CPUs we're allowed to use, which respects taskset and
+        # cgroup restrictions, and see how many SMT threads share cpu0's core.
+        logical = allowedCpus()
+        try:
+            with open("/sys/devices/system/cpu/cpu0/topology/thread_siblings_list") as f:
+                threadsPerCore = countCpuList(f.read())
+        except OSError:
+            # Try to extract more info from lscpu
+            lscpu = capture("lscpu")
+            threadsPerCore = 0
+            for line in lscpu.split("\n"):
+                if "Thread(s) per core:" in line:
+                    threadsPerCore = int(line.split(":")[1])
+                    break
+            if threadsPerCore == 0:
+                # Dubious in the extreme
+                threadsPerCore = {"aarch64" : 4, "x86_64" : 2}[arch]
+        cores = max(1, logical//threadsPerCore)
+
+    if systemName == "Darwin":
         # On Apple we have to be careful because on the M1 machines
         # they also emulate X86_64, so what we see here from Python's
         # platform module may reflect the Python interpreter was built,
@@ -46,63 +106,60 @@ def extractMachineInfo():
         # out, we don't actually do it here.
         # if int(capture("sysctl -n hw.optional.arm64")):
         #    arch = "aarch64"
-        cores = int(capture("sysctl -n hw.physicalcpu"))
-        threads = int(capture("sysctl -n hw.logicalcpu"))
-        threadsPerCore = threads//cores
         # Similarly for the model name.
         # modelName = capture("sysctl -n machdep.cpu.brand_string").strip()
+        _machineInfoCached = True
         return
 
-    # Linux...
-    # Not as good as sysctl, since it doesn't easily distinguish SMT threads
-    # and "real" CPUs.
-    cores = os.cpu_count()
-    # Try to extract more info from lscpu
-    lscpu = capture("lscpu")
-    threadsPerCore = 0
-    for line in lscpu.split("\n"):
-        if "Thread(s) per core:" in line:
-            threadsPerCore = int(line.split(":")[1])
-            break
-    if threadsPerCore == 0:
-        # Dubious in the extreme
-        threadsPerCore = {"aarch64" : 4, "x86_64" : 2}[arch]
-    cores = cores//threadsPerCore
-
-    modelName = cpuInfo.getCpuInfo("model name")
+    modelName = cpuInfo.getPackageName()
     # if we can't, then see if it's one of the machines we know about...
     if modelName == "":
         # Host name to model name. Very installation dependent.
         # Fixes needed here for other environments
-        hostName = platform.node().split(".")[0]
         knownHostTags = { "xcil": "Marvell ThunderX2 ARM v8.1",
                           "a64fx": "Fujitsu A64FX"}
-        for k in knownHostTags.keys():
-            if hostName in k:
-                modelName = knownHostTags[k]
-                break
+        # The tags are parts of host names (e.g. xcil00, xcil01)
+        modelName = next(
+            (model for (tag, model) in knownHostTags.items() if tag in hostName), ""
+        )
+    # Only remember the answer once all of the probing has succeeded.
+    _machineInfoCached = True
             
 # Functions which may be useful elsewhere
-def outputName(test):
-    """Generate an output file name based on the test, hostname, date, and a sequence number"""
-    dateString = datetime.date.today().isoformat()
-    nameBase = test + "_" + hostName + "_" + dateString
-    nameBase = nameBase.replace("__", "_")
-    fname = nameBase + "_1.res"
-    version = 1
-    while os.path.exists(fname):
-        version = version + 1
-        fname = nameBase + "_" + str(version) + ".res"
-    return fname
-
-
-def execute(cmd, output = None):
-    if output:
-        output = "> " + output
-        print("Running " + cmd + output)
-    else:
-        output = ""
-    subprocess.run(cmd + output, shell=True)
+_versionRe = re.compile(r"_([0-9]+)\.res")
+_underscoresRe = re.compile(r"__+")
+
+def outputName(test, dateString=None):
+    """Generate an output file name based on the test, hostname, date, and a sequence number.
+    Callers generating many names can pass in today's date as an ISO format string."""
+    if not dateString:
+        dateString = datetime.date.today().isoformat()
+    nameBase = _underscoresRe.sub("_", test + "_" + hostName + "_" + dateString)
+    # Look at the existing files once, rather than probing for each version in turn.
+    versions = [
+        int(m.group(1))
+        for m in (
+            _versionRe.fullmatch(f, len(nameBase))
+            for f in glob.glob(glob.escape(nameBase) + "_*.res")
+        )
+        if m
+    ]
+    version = max(versions) + 1 if versions else 1
+    return nameBase + "_" + str(version) + ".res"
+
+
+def execute(cmd, output = None, env = None):
+    """Run cmd, which is split into arguments as the shell would, without a shell.
+    env is a dictionary of extra environment variables for the child, and
+    if output is given the child's stdout is written to that file"""
+    envString = "".join(k + "=" + shlex.quote(v) + " " for (k, v) in env.items()) if env else ""
+    childEnv = dict(os.environ, **env) if env else None
+    if not output:
+        subprocess.run(shlex.split(cmd), env=childEnv)
+        return
+    print("Running " + envString + cmd + " > " + output)
+    with open(output, "w") as outputFile:
+        subprocess.run(shlex.split(cmd), env=childEnv, stdout=outputFile)
 
 
 def getExecutable(image):
@@ -112,21 +169,30 @@ def getExecutable(image):
     return "./" + image
     
 def computeEnv():
+    global _env
+    if _env is not None:
+        return _env
+
     extractMachineInfo()
     print ("Arch (may be wrong!):", arch,"\nModel:",modelName,"\nCores: ", cores)
     
-    env = ("TARGET_MACHINE='" + modelName + "' ") if modelName else ""
-    env += "OMP_NUM_THREADS=" + str(cores)
-    env += " KMP_HW_SUBSET=1T KMP_AFFINITY='compact,granularity=fine' "
+    env = {"TARGET_MACHINE": modelName} if modelName else {}
+    env["OMP_NUM_THREADS"] = str(cores)
+    env["KMP_HW_SUBSET"] = "1T"
+    env["KMP_AFFINITY"] = "compact,granularity=fine"
+    _env = env
     return env
 
 
 class runDescription:
-    def __init__(self, image, subOpts, extraOpts, prefix):
+    def __init__(self, image, subOpts, extraOpts, prefix, parallel=False):
         self.subOptions = subOpts
         self.extraOptions = extraOpts
         self.image = image
         self.outputNamePrefix = prefix
+        # Only set parallel for benchmarks which don't need the whole machine,
+        # since it runs several of them at once.
+        self.parallel = parallel
 
     def __str__(self):
         return (
@@ -138,9 +204,63 @@ class runDescription:
             + str(self.subOptions)
             + "\nextraOptions: "
             + str(self.extraOptions)
+            + "\nparallel: "
+            + str(self.parallel)
         )
 
 
+# Standard run descriptions for the benchmarks, shared by the run*.py drivers.
+# The same objects are handed to every caller, so treat them as read-only;
+# build a new runDescription if you need a variant.
+otherLocks = ("O", "P")  # OpenMP, pthread_mutex; add "X" for exchange
+nonSpeculativeLocks = ("A", "B", "C", "M", "T", "U") + otherLocks
+speculativeLocks = ("Q", "R")
+STANDARD_CONFIGS = {
+    "LS": runDescription(
+        getExecutable("loadsStores"),
+        # For the moment don't run 'N' it doesn't seem to work...
+        {
+            "L": ("",),
+            "M": ("",),
+            # "N": ("",),
+            "P": ("ru", "rm", "wu", "wm", "au", "am"),
+            "R": ("a", "w"),
+            "S": ("ru", "rm", "wu", "wm", "au", "am"),
+            "V": ("",),
+        },
+        {},
+        "LS",
+    ),
+    "Futex": runDescription(
+        getExecutable("futex"), {"R": ("",), "L": ("",),}, {}, "Futex"
+    ),
+    "Atomics": runDescription(
+        getExecutable("atomics"),
+        {"I": ("e", "f", "i", "t"), "B": ("",)},
+        {},
+        "Atomics",
+    ),
+    "Locks": runDescription(
+        getExecutable("locks"),
+        {
+            "C": nonSpeculativeLocks,
+            # S only makes sense with icc or clang
+            "S": speculativeLocks + nonSpeculativeLocks,
+            "I": ("A", "T"),
+            "M": speculativeLocks + ("C", "M"),
+            "O": nonSpeculativeLocks,
+            "X": nonSpeculativeLocks,
+        },
+        {
+            "C": [str(i) for i in (1, 2, 4, 8, 16)],
+            "X": [str(i) for i in (1, 2, 4, 8, 16)],
+            "M": [str(i) for i in (0, 1, 2, 5, 10)],
+        },
+        "Locks",
+    ),
+}
+
+
 def runBM(runDesc, tests=None):
     """Run a specific benchmark with the required arguments"""
 
@@ -153,10 +273,26 @@ def runBM(runDesc, tests=None):
 
     # print(runDesc)
     env = computeEnv()
-    for test in tests:
-        for opt in runDesc.subOptions.get(test, ("",)):
-            for extra in runDesc.extraOptions.get(test, ("",)):
-                execute(
-                    env + runDesc.image + " " + test + opt + " " + extra,
-                    outputName(runDesc.outputNamePrefix + test + opt + "_" + extra),
-                )
+    today = datetime.date.today().isoformat()
+    jobs = [
+        (
+            runDesc.image + " " + test + opt + " " + extra,
+            outputName(runDesc.outputNamePrefix + test + opt + "_" + extra, today),
+        )
+        for test in tests
+        for opt in runDesc.subOptions.get(test, ("",))
+        for extra in runDesc.extraOptions.get(test, ("",))
+    ]
+    if not runDesc.parallel:
+        for (cmd, output) in jobs:
+            execute(cmd, output, env)
+        return
+
+    workers = max(1, min(len(jobs), os.cpu_count() or 1))
+    # Share the cores between the jobs which run at the same time, and don't
+    # bind their threads, since compact affinity would put every job on the
+    # same cores.
+    env = dict(env, OMP_NUM_THREADS=str(max(1, cores // workers)))
+    del env["KMP_AFFINITY"]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(lambda job: execute(job[0], job[1], env), jobs))
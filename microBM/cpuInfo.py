@@ -6,32 +6,112 @@
 #
 # ===------------------------------------------------------------------------===
 
-import re
+import ctypes
+
+# pytorch/cpuinfo does the hard work of identifying the processor once, and
+# then answers from cached structures. It also knows about aarch64, where
+# /proc/cpuinfo is not much use. It's optional, though, so if we can't find
+# it we fall back to reading /proc/cpuinfo ourselves.
+CPUINFO_PACKAGE_NAME_MAX = 48
+
+
+class cpuinfoPackage(ctypes.Structure):
+    """The leading fields of struct cpuinfo_package from cpuinfo.h"""
+
+    _fields_ = [
+        ("name", ctypes.c_char * CPUINFO_PACKAGE_NAME_MAX),
+        ("processor_start", ctypes.c_uint32),
+        ("processor_count", ctypes.c_uint32),
+        ("core_start", ctypes.c_uint32),
+        ("core_count", ctypes.c_uint32),
+    ]
+
+
+def loadCpuinfoLibrary():
+    """Load and initialize libcpuinfo, returning None if it is not available"""
+    # Only try the names it's normally installed as; ctypes.util.find_library
+    # would run ldconfig and the compiler to search, which is slower than the
+    # lscpu we're trying to avoid.
+    for libName in ("libcpuinfo.so.0", "libcpuinfo.so", "libcpuinfo.dylib"):
+        try:
+            lib = ctypes.CDLL(libName)
+        except OSError:
+            continue
+        lib.cpuinfo_initialize.restype = ctypes.c_bool
+        lib.cpuinfo_get_package.restype = ctypes.POINTER(cpuinfoPackage)
+        lib.cpuinfo_get_package.argtypes = [ctypes.c_uint32]
+        lib.cpuinfo_get_cores_count.restype = ctypes.c_uint32
+        lib.cpuinfo_get_processors_count.restype = ctypes.c_uint32
+        return lib if lib.cpuinfo_initialize() else None
+    return None
+
+
+_lib = loadCpuinfoLibrary()
+
+
+# Fields from /proc/cpuinfo, read the first time that anyone asks.
+_fields = None
+
+
+def refresh():
+    """(Re)read /proc/cpuinfo, keeping the first value seen for each field"""
+    global _fields
+    _fields = {}
+    try:
+        with open("/proc/cpuinfo", "rb") as cpuInfo:
+            contents = cpuInfo.read()
+    except:
+        return
+    # On big machines the file is mostly the same block of fields repeated
+    # for each logical CPU. Since we keep the first value for each field we
+    # only need to look at the first of those, and at any machine-wide
+    # blocks (such as "Hardware" on some Arm systems).
+    # (We can't mmap it; files in /proc claim to be empty.)
+    seenProcessor = False
+    for block in contents.split(b"\n\n"):
+        if block.startswith(b"processor"):
+            if seenProcessor:
+                continue
+            seenProcessor = True
+        for line in block.decode("utf-8", "replace").splitlines():
+            (field, sep, value) = line.partition(":")
+            if sep:
+                _fields.setdefault(field.strip(), value.strip())
 
 
 def getCpuInfo(field):
     """Read a given field from /proc/cpuinfo
-    Returns the first line which has the relevant fieldname
-    Opens and reads the file once for each enquiry, but this is mostly for
-    headers and so on, so it's probably not worth worrying about!
+    Returns the value from the first line which has the relevant fieldname.
+    The file is only read once, so call refresh() if you need a rescan.
     """
     # Unfortunately /proc/cpuinfo on the aarch64 machines is rather unhelpful
     # it has none of the interesting fields below :-(
     # Which makes this less useful than I had hoped.
-    regexp = "^" + field + "\s+: *(.*)$"
-    lineMatch = re.compile(regexp)
+    if _fields is None:
+        refresh()
+    return _fields.get(field, "")
 
-    try:
-        with open("/proc/cpuinfo", "r") as cpuInfo:
-            for line in cpuInfo:
-                match = lineMatch.match(line)
-                if match:
-                    return match.group(1).strip()
-    except:
-        return ""
-    return ""
+
+def getPackageName():
+    """Return the marketing name of the processor package"""
+    if _lib:
+        return _lib.cpuinfo_get_package(0).contents.name.decode("utf-8").strip()
+    return getCpuInfo("model name")
+
+
+def getCoresCount():
+    """Return the number of physical cores, or zero if we can't tell"""
+    return _lib.cpuinfo_get_cores_count() if _lib else 0
+
+
+def getProcessorsCount():
+    """Return the number of logical processors, or zero if we can't tell"""
+    return _lib.cpuinfo_get_processors_count() if _lib else 0
 
 
 if __name__ == "__main__":
     for field in ("model name", "cpu cores", "vendor_id"):
         print('getCpuInfo("' + field + '") = ' + getCpuInfo(field))
+    print("getPackageName() = " + getPackageName())
+    print("getCoresCount() = " + str(getCoresCount()))
+    print("getProcessorsCount() = " + str(getProcessorsCount()))
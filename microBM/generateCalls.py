@@ -9,42 +9,41 @@
 #
 # Generate functions with different numbers of arguments so that we can see how they are passed.
 #
-def generateDefinition(n):
-    print("void f%d(" % n, end="")
-    for i in range(n):
-        print("void * arg%d" % (i + 1), end="")
-        if i != n - 1:
-            print(", ", end="")
-            if (i & 3) == 3:
-                print("\n%s" % (" " * (15 if n < 10 else 16)), end="")
-    print(")", end="")
+import sys
 
 
-def generateExtern(n):
-    print("extern ", end="")
-    generateDefinition(n)
-    print(";")
+def formatArgs(args, indent):
+    """Join the arguments with commas, starting a new line after every fourth one"""
+    res = ""
+    for (i, arg) in enumerate(args):
+        res += arg
+        if i != len(args) - 1:
+            res += ", "
+            if (i & 3) == 3:
+                res += "\n" + " " * indent
+    return res
 
 
-def generateCall(n):
-    print("    f%d(" % n, end="")
-    for i in range(n):
-        print("(void *)%d" % i, end="")
-        if i != n - 1:
-            print(", ", end="")
-            if (i & 3) == 3:
-                print("\n%s" % (" " * (7 if n < 10 else 8)), end="")
-    print(");")
+# The argument lists only depend on n, so build them once.
+maxArgs = 16
+_argList = {
+    n: formatArgs([f"void * arg{i + 1}" for i in range(n)], 15 if n < 10 else 16)
+    for n in range(maxArgs + 1)
+}
+_callArgs = {
+    n: formatArgs([f"(void *){i}" for i in range(n)], 7 if n < 10 else 8)
+    for n in range(maxArgs + 1)
+}
 
 
-def generateCalls(n):
-    print("void test()\n{")
-    for i in range(0, n + 1):
-        generateCall(i)
-    print("}")
+# The shape of the generated code is fixed, only n varies.
+externTemplate = "extern void f{n}({args});\n"
+callTemplate = "    f{n}({args});\n"
+testTemplate = "void test()\n{{\n{body}}}\n"
 
+# Each test() calls f0 ... fn, so its body is a prefix of the same list of calls.
+calls = [callTemplate.format(n=n, args=_callArgs[n]) for n in range(maxArgs + 1)]
 
-for i in range(0, 17):
-    generateExtern(i)
-for i in range(0, 17):
-    generateCalls(i)
+out = [externTemplate.format(n=n, args=_argList[n]) for n in range(maxArgs + 1)]
+out += [testTemplate.format(body="".join(calls[: n + 1])) for n in range(maxArgs + 1)]
+sys.stdout.write("".join(out))
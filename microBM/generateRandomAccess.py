@@ -8,11 +8,14 @@
 
 # Use python to generate a random sequence of accesses to elements in an array,
 # where each element is accessed once.
+# We accumulate all of the output lines and write them in one go at the end.
 import random
+import sys
+from optparse import OptionParser
 
 
 def access(action, pos):
-    print("  Array[", pos, "]." + action + "();")
+    return "  Array[ " + str(pos) + " ]." + action + "();"
 
 
 # Generate the random access functions and table of function pointers.
@@ -26,49 +29,56 @@ def generateFunctionName(opName, needArg):
     )
 
 
-print(generateFunctionName("Load", True) + ";")
-print(generateFunctionName("Store", True) + ";")
-print(generateFunctionName("AtomicInc", True) + ";")
+def generateFunction(opName, needArg, body):
+    return "\n".join([generateFunctionName(opName, needArg), "{"] + body + ["}"])
+
+
+options = OptionParser()
+options.add_option(
+    "-o",
+    "--output",
+    action="store",
+    type="string",
+    dest="output",
+    default=None,
+    help="File into which to write the output, rather than stdout",
+)
+(options, args) = options.parse_args()
+
+out = [
+    generateFunctionName("Load", True) + ";",
+    generateFunctionName("Store", True) + ";",
+    generateFunctionName("AtomicInc", True) + ";",
+]
 
 numStores = 32
-for n in range(numStores):
-    print(generateFunctionName(str(n) + "Store", n != 0) + ";")
+out += [generateFunctionName(str(n) + "Store", n != 0) + ";" for n in range(numStores)]
 
-print("static Operation writeFns[] = {")
-for n in range(numStores):
-    print("do" + str(n) + "Stores,")
-print("};")
+out.append("static Operation writeFns[] = {")
+out += ["do" + str(n) + "Stores," for n in range(numStores)]
+out.append("};")
 
 numElements = 256
-indices = list(range(numElements))
-random.shuffle(indices)
-
-print(generateFunctionName("Load", True))
-print("{")
-for i in indices:
-    access("load", i)
-print("}")
-
-random.shuffle(indices)
-print(generateFunctionName("Store", True))
-print("{")
-for i in indices:
-    access("store", i)
-print("}")
-
-random.shuffle(indices)
-print(generateFunctionName("AtomicInc", True))
-print("{")
-for i in indices:
-    access("atomicInc", i)
-print("}")
-
-for n in range(numStores):
-    random.shuffle(indices)
-    print(generateFunctionName(str(n) + "Store", n != 0))
-    print("{")
+fullOps = (("Load", "load"), ("Store", "store"), ("AtomicInc", "atomicInc"))
+# Choose all of the access orders up front. The whole array is visited for
+# the full operations, but the n store functions only need n distinct
+# elements, so we just sample those rather than shuffling everything.
+orders = [random.sample(range(numElements), numElements) for op in fullOps]
+orders += [random.sample(range(numElements), n) for n in range(numStores)]
+
+for ((opName, action), order) in zip(fullOps, orders):
+    out.append(generateFunction(opName, True, [access(action, i) for i in order]))
+
+for (n, order) in enumerate(orders[len(fullOps) :]):
+    body = []
     if n > 0:
-        for i in indices[: n - 1]:
-            access("store", i)
-        access("storeRelease", indices[n - 1])
-    print("}")
+        body = [access("store", i) for i in order[:-1]]
+        body.append(access("storeRelease", order[-1]))
+    out.append(generateFunction(str(n) + "Store", n != 0, body))
+
+text = "\n".join(out) + "\n"
+if options.output:
+    with open(options.output, "w") as outputFile:
+        outputFile.write(text)
+else:
+    sys.stdout.write(text)
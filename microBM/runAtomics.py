@@ -11,11 +11,4 @@
 #
 import BMutils
 
-runDesc = BMutils.runDescription(
-    BMutils.getExecutable("atomics"),
-    {"I": ("e", "f", "i", "t"), "B": ("",)},
-    {},
-    "Atomics",
-)
-
-BMutils.runBM(runDesc, ("I",))  # Subset of benchmarks
+BMutils.runBM(BMutils.STANDARD_CONFIGS["Atomics"], ("I",))  # Subset of benchmarks
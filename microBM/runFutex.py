@@ -8,7 +8,4 @@
 
 import BMutils
 
-runDesc = BMutils.runDescription(
-    BMutils.getExecutable("futex"), {"R": ("",), "L": ("",),}, {}, "Futex"
-)
-BMutils.runBM(runDesc)
+BMutils.runBM(BMutils.STANDARD_CONFIGS["Futex"])
@@ -8,24 +8,9 @@
 
 import BMutils
 
-runDesc = BMutils.runDescription(
-    BMutils.getExecutable("loadsStores"),
-    # For the moment don't run 'N' it doesn't seem to work...
-    {
-        "L": ("",),
-        "M": ("",),
-        # "N": ("",),
-        "P": ("ru", "rm", "wu", "wm", "au", "am"),
-        "R": ("a", "w"),
-        "S": ("ru", "rm", "wu", "wm", "au", "am"),
-        "V": ("",),
-    },
-    {},
-    "LS",
-)
 # Choose a subset of tests to run here.
 tests = ("P",)
 # None => all :-)
 tests = None
 
-BMutils.runBM(runDesc, tests)
+BMutils.runBM(BMutils.STANDARD_CONFIGS["LS"], tests)
@@ -8,26 +8,4 @@
 
 import BMutils
 
-otherLocks = ("O", "P", "X")  # OpenMP, pthread_mutex, exchange
-otherLocks = ("O", "P")  # OpenMP, pthread_mutex
-nonSpeculativeLocks = ("A", "B", "C", "M", "T", "U") + otherLocks
-speculativeLocks = ("Q", "R")
-runDesc = BMutils.runDescription(
-    getExecutable("locks"),
-    {
-        "C": nonSpeculativeLocks,
-        # S only makes sense with icc or clang
-        "S": speculativeLocks + nonSpeculativeLocks,
-        "I": ("A", "T"),
-        "M": speculativeLocks + ("C", "M"),
-        "O": nonSpeculativeLocks,
-        "X": nonSpeculativeLocks,
-    },
-    {
-        "C": [str(i) for i in (1, 2, 4, 8, 16)],
-        "X": [str(i) for i in (1, 2, 4, 8, 16)],
-        "M": [str(i) for i in (0, 1, 2, 5, 10)],
-    },
-    "Locks",
-)
-BMutil.runBM(runDesc)
+BMutils.runBM(BMutils.STANDARD_CONFIGS["Locks"])
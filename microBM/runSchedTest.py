@@ -11,7 +11,6 @@
 #
 
 import subprocess
-import platform
 import datetime
 import os.path
 import re
@@ -28,7 +27,7 @@ def main():
     arch = BMU.arch
     threadLimit = BMU.cores
     # See if we can find out more about the machine
-    modelName = BMU.getModelName()
+    modelName = BMU.modelName
     # If we can't see if it's one of the machines we know about...
     if modelName == "":
         modelName = {
@@ -57,14 +56,15 @@ def main():
     # The DYLD_LIBRARY_PATH is *not* passed on to a grandchild process
     # by default, so we have to pass it explicitly.
     libPathName = (
-        "DYLD_LIBRARY_PATH" if platform.system() == "Darwin" else "LD_LIBRARY_PATH"
+        "DYLD_LIBRARY_PATH" if BMU.systemName == "Darwin" else "LD_LIBRARY_PATH"
     )
     currentPath = os.getenv(libPathName)
     currentPath = currentPath if currentPath != None else ""
-    baseEnv = libPathName + "=" + libPath + currentPath
-    baseEnv += (
-        " KMP_HW_SUBSET=1T KMP_AFFINITY='compact,granularity=fine' OMP_NUM_THREADS="
-    )
+    baseEnv = {
+        libPathName: libPath + currentPath,
+        "KMP_HW_SUBSET": "1T",
+        "KMP_AFFINITY": "compact,granularity=fine",
+    }
 
     image = BMU.getExecutable("scheduling")
     print("Time/cell")
@@ -73,7 +73,10 @@ def main():
     print("Cores, Samples, Min, Mean, Max, SD", flush=True)
     base = [1, 2] if threadLimit > 2 else [1]
     for t in base + list(range(4, threadLimit - 1, 4)) + [threadLimit]:
-        BMU.execute(baseEnv + str(t) + " " + image + " " + experiment + "_" + schedule)
+        BMU.execute(
+            image + " " + experiment + "_" + schedule,
+            env=dict(baseEnv, OMP_NUM_THREADS=str(t)),
+        )
 
 
 if __name__ == "__main__":
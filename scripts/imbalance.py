@@ -9,12 +9,23 @@
 # This file contains code which demonstrates the expected theoretical
 # performance of static schedules on triangular loops.
 
-# Just evaluate the sum of the iteration times directly;
-# We could do it analytically, but for small cases this if fine.
+# Print the work for each thread as well as the summary?
+verbose = False
+
+
+# The iteration times are just the iteration numbers, so each thread's work
+# is the sum of an arithmetic series, which we can evaluate directly.
+def seriesSum(first, step, n):
+    """Sum of n terms of the arithmetic series first, first+step, ..."""
+    return n * (2 * first + (n - 1) * step) // 2
+
+
 def cyclic1Time(me, nthreads, count):
-    myIterations = range(me + 1, count + 1, nthreads)
-    print("Cyclic1 ", me, ",", sum(myIterations))
-    return sum(myIterations)
+    myIterations = max(0, (count - (me + 1)) // nthreads + 1)
+    work = seriesSum(me + 1, nthreads, myIterations)
+    if verbose:
+        print("Cyclic1 ", me, ",", work)
+    return work
 
 
 def blockedTime(me, nthreads, count):
@@ -27,8 +38,10 @@ def blockedTime(me, nthreads, count):
         myBase = 1 + leftover + me * wholeIters
         myEnd = myBase + wholeIters - 1
 
-    print("Blocked ", me, ": ", sum(range(myBase, myEnd + 1)))
-    return sum(range(myBase, myEnd + 1))
+    work = seriesSum(myBase, 1, myEnd - myBase + 1)
+    if verbose:
+        print("Blocked ", me, ": ", work)
+    return work
 
 
 def efficiency(distribution):
@@ -9,6 +9,11 @@
 import re
 import sys
 import os
+import io
+import functools
+import bisect
+import collections
+import operator
 
 import matplotlib
 
@@ -17,20 +22,39 @@ matplotlib.use("Agg")
 
 import matplotlib.pyplot as plt
 import matplotlib.font_manager
+from matplotlib.ticker import StrMethodFormatter, EngFormatter
 import numpy
 import math
 import glob
+from optparse import OptionParser
 
 htmlFile = None
+# HTML output is accumulated here and written to htmlFile by flushHtml.
+htmlBuffer = io.StringIO()
 outputDir = "."
 
 # We scale down by this on input
 scaleFactor = 1
 
+# Report progress on each plot as we generate it?
+verbose = False
+
+# Resolution of the saved plots. The HTML shows them 1000 pixels wide, so
+# there's no need to render them at print resolution unless asked to.
+plotDpi = 150
+
 
 def outputHtml(s):
     """Output a string to the html file with a trailing newline"""
-    htmlFile.write(s + "\n")
+    htmlBuffer.write(s)
+    htmlBuffer.write("\n")
+
+
+def flushHtml():
+    """Write the buffered HTML to the html file"""
+    htmlFile.write(htmlBuffer.getvalue())
+    htmlBuffer.seek(0)
+    htmlBuffer.truncate(0)
 
 
 def outputHtmlFileHeader(pageTitle):
@@ -53,53 +77,50 @@ def outputHtmlFileHeader(pageTitle):
 
 def mean(l):
     """Compute arithmetic mean of a list"""
-    return sum(l) / len(l) if len(l) != 0 else 0.0
+    return float(numpy.mean(l)) if len(l) != 0 else 0.0
 
 
 def geomean(l):
     """Compute the geometric mean of a list"""
-    return math.exp(mean([math.log(v) for v in l if v != 0]))
-
-
-def standardDeviation(values, mv):
-    return math.sqrt(sum([(v - mv) * (v - mv) for v in values]) / len(values))
+    a = numpy.asarray(l, dtype=float)
+    return math.exp(mean(numpy.log(a[a != 0])))
 
 
 def transpose(h):
     """Transpose a hash of hashes so that the inner keys are now outer"""
     res = {}
-    for i in list(h.keys()):
-        v = h[i]
-        for j in list(v.keys()):
-            if not res.get(j, None):
-                res[j] = {}
-            res[j][i] = v[j]
+    for (i, v) in h.items():
+        for (j, x) in v.items():
+            res.setdefault(j, {})[i] = x
     return res
 
 
+dateRe = re.compile(r"([0-9]+)([A-Z][a-z]+)([0-9]+)")
+monthOrdinals = {
+    m: i
+    for (i, m) in enumerate("Jan Feb Mar Apr May Jun Jul Aug Sep Oct Nov Dec".split())
+}
+
+
 def convertDate(d):
-    fields = re.match(r"([0-9]+)([A-Z][a-z]+)([0-9]+)", d)
+    fields = dateRe.match(d)
     day = fields.group(1)
     month = fields.group(2)
     year = fields.group(3)
-    monthOrdinal = (
-        "Jan",
-        "Feb",
-        "Mar",
-        "Apr",
-        "May",
-        "Jun",
-        "Jul",
-        "Aug",
-        "Sep",
-        "Oct",
-        "Nov",
-        "Dec",
-    ).index(month)
-
-    return int(year) * 10000 + monthOrdinal * 100 + int(day)
 
+    return int(year) * 10000 + monthOrdinals[month] * 100 + int(day)
 
+
+@functools.lru_cache(maxsize=None)
+def tokenize(impl):
+    """Split an implementation name into a tuple of its stripped comma separated fields"""
+    return tuple(f.strip() for f in impl.split(","))
+
+
+digitsRe = re.compile(r"[0-9]+")
+
+
+@functools.lru_cache(maxsize=None)
 def extractDigits(key):
     """Split a string which may contain a number into
     a tuple of the string without the digits, and the
@@ -107,88 +128,48 @@ def extractDigits(key):
     a good thing to sort on, so that we get
     "a5" and "a15"
     """
-    text = ""
-    digits = ""
-    for c in key:
-        if c in "0123456789":
-            digits += c
-        else:
-            text += c
-    return (text, 0 if not digits else int(digits))
-
-
-def comparePair(p1, p2):
-    if p1[0] < p2[0]:
-        return -1
-    if p1[0] > p2[0]:
-        return +1
-    if p1[1] < p2[1]:
-        return -1
-    if p1[1] > p2[1]:
-        return +1
-    return 0
-
-
-def compareFn(impl1, impl2):
-    """ Choose a good ordering for the implementations"""
-    for (v1, v2) in zip(
-        [extractDigits(f.strip()) for f in impl1.split(",")],
-        [extractDigits(f.strip()) for f in impl2.split(",")],
-    ):
-        res = comparePair(v1, v2)
-        if res:
-            return res
-    return 0
-
-
-def cmp_to_key(mycmp):
-    "Convert a cmp= function into a key= function"
-
-    class K:
-        def __init__(self, obj, *args):
-            self.obj = obj
-
-        def __lt__(self, other):
-            return mycmp(self.obj, other.obj) < 0
-
-        def __gt__(self, other):
-            return mycmp(self.obj, other.obj) > 0
-
-        def __eq__(self, other):
-            return mycmp(self.obj, other.obj) == 0
+    digits = "".join(digitsRe.findall(key))
+    return (digitsRe.sub("", key), 0 if not digits else int(digits))
 
-        def __le__(self, other):
-            return mycmp(self.obj, other.obj) <= 0
 
-        def __ge__(self, other):
-            return mycmp(self.obj, other.obj) >= 0
-
-        def __ne__(self, other):
-            return mycmp(self.obj, other.obj) != 0
-
-    return K
+# The same implementations appear in many plots, so remember their keys.
+@functools.lru_cache(maxsize=None)
+def implKey(impl):
+    """A sort key which gives a good ordering for the implementations.
+    Each comma separated field is compared as (text, number)."""
+    return tuple(extractDigits(f) for f in tokenize(impl))
 
 
 def pick(s, v):
     return s[v % len(s)]
 
 
-def mapToIndex(specificProps, properties, idx):
+def mapToIndex(propIndices, properties, idx):
+    """propIndices is a list of dictionaries mapping each property value to its index"""
     try:
-        return specificProps[idx].index(properties[idx].strip())
-    except:
+        return propIndices[idx].get(properties[idx], 0)
+    except IndexError:
         return 0
 
 
+def fieldValues(implv):
+    """Find the set of values which each field of the implementation names takes"""
+    specificProps = []
+    for impl in implv:
+        fields = tokenize(impl)
+        # Add sets for any fields we haven't seen before
+        specificProps += [set() for i in range(len(fields) - len(specificProps))]
+        for (i, p) in enumerate(fields):
+            specificProps[i].add(p)
+    return specificProps
+
+
 def moveCommonToTitle(title, results):
     # If we have properties that are common across all of our implementations,
     # we can remove them from the names of the individual experiments and into the title of the whole
     # set of readings.
     implv = list(results.keys())
-    specificProps = [set() for i in range(max([len(i.split(",")) for i in implv]))]
-    for impl in implv:
-        for (i, p) in enumerate(impl.split(",")):
-            specificProps[i] |= set((p.strip(),))
+    specificProps = fieldValues(implv)
 
     #   print "implv: " + str(implv)
     redundantFields = [i for (i, s) in enumerate(specificProps) if len(s) == 1]
@@ -200,14 +181,14 @@ def moveCommonToTitle(title, results):
     # Yay, we have something we can handle
     # First extract the relevant fields from any of the implementations
     fields = [
-        p.strip()
-        for (i, p) in enumerate(implv[0].split(","))
-        if i in redundantFields and p.strip() != ""
+        p
+        for (i, p) in enumerate(tokenize(implv[0]))
+        if i in redundantFields and p != ""
     ]
     if fields:
         title = title + ": " + (",".join(fields))
     for impl in implv:
-        fields = [p.strip() for p in impl.split(",")]
+        fields = tokenize(impl)
         newName = ",".join(
             [fields[i] for i in range(len(fields)) if i not in redundantFields]
         )
@@ -220,58 +201,63 @@ def filterCorrelations(specificProps, implv):
     pass
 
 
+# The styles used to distinguish the implementations in plots.
+# The lengths of the styles and colours lists should be co-prime,
+# so that you don't get replication of the same style and colour before
+# you have seen the product of the two lengths.
+markerStyles = ("+", "*", "o", "^", "D", "v", "x", "p", "s", "h")
+monoColours = ("black",)
+lineColours = (
+    "blue",
+    "red",
+    "green",
+    "black",
+    "orange",
+    "pink",
+    "turquoise",
+    "indigo",
+    "violet",
+    "cyan",
+    "sienna",
+    "chartreuse",
+    "darkviolet",
+    "orchid",
+    "gold",
+    "hotpink",
+)
+# See https://matplotlib.org/3.1.1/gallery/lines_bars_and_markers/linestyles.html?highlight=linestyle
+# for details of line styles and the meaning of the numeric lists!
+lineStyles = (
+    "solid",
+    "dotted",
+    "dashed",
+    "dashdot",
+    (0, (1, 10)),
+    (0, (3, 5, 1, 5)),
+)
+
+
 def computeStyles(implv, monotone=False):
     """Compute the line colour and point style for each implementation once
     so that all plots are consistent.
     """
-    # The lengths of the styles and colours lists should be co-prime,
-    # so that you don't get replication of the same style and colour before
-    # you have seen the product of the two lengths.
-    styles = ("+", "*", "o", "^", "D", "v", "x", "p", "s", "h")
-    if monotone:
-        colours = ("black",)
-    else:
-        colours = (
-            "blue",
-            "red",
-            "green",
-            "black",
-            "orange",
-            "pink",
-            "turquoise",
-            "indigo",
-            "violet",
-            "cyan",
-            "sienna",
-            "chartreuse",
-            "darkviolet",
-            "orchid",
-            "gold",
-            "hotpink",
-        )
-    # See https://matplotlib.org/3.1.1/gallery/lines_bars_and_markers/linestyles.html?highlight=linestyle
-    # for details of line styles and the meaning of the numeric lists!
-    linestyles = (
-        "solid",
-        "dotted",
-        "dashed",
-        "dashdot",
-        (0, (1, 10)),
-        (0, (3, 5, 1, 5)),
-    )
-
+    styles = markerStyles
+    colours = monoColours if monotone else lineColours
+    linestyles = lineStyles
     allStyles = {"styles": styles, "colours": colours, "linestyles": linestyles}
+    styleLengths = {k: len(v) for (k, v) in allStyles.items()}
+
+    # With only one implementation there's nothing to distinguish, so use the first style.
+    if len(implv) == 1:
+        return {implv[0]: (styles[0], colours[0], "-")}
 
     # We try to be more specific, to make things easier to understand
-    specificProps = [set() for i in range(max([len(i.split(",")) for i in implv]))]
-    for impl in implv:
-        for (i, p) in enumerate(impl.split(",")):
-            specificProps[i] |= set((p.strip(),))
+    specificProps = fieldValues(implv)
 
     # There may be redundancy here, though. (E.g. a set of KNC readings all on Jan 1 and KNL readings all on Jan 2
     # Try to filter that out (currently does nothing...)
     filterCorrelations(specificProps, implv)
-    if False:
+    if verbose:
         print("SpecificProps:")
         for s in specificProps:
             print(str(s) + " length: " + str(len(s)))
@@ -283,21 +269,20 @@ def computeStyles(implv, monotone=False):
 
     if requiredDimensions > 0 and requiredDimensions <= 3:
         # Try to find a good mapping so that a specific property has the same visual representation
-        encodingToProperty = dict([(k, -1) for k in list(allStyles.keys())])
+        encodingToProperty = {k: -1 for k in allStyles}
         nextProp = 0
-        used = dict([(k, False) for k in list(allStyles.keys())])
+        used = {k: False for k in allStyles}
 
         # If all of the properties have the same number of values, then just allocate based on the order in
         # which they appeared, mapping 1st => colour, second->style, third -> linestyle
         propLens = [len(p) for p in specificProps if len(p) != 1]
         # print("specificProps: ", specificProps, " propLens: ", propLens)
         l0 = propLens[0]
-        if l0 < min([len(s) for s in list(allStyles.values())]) and all(
+        if l0 < min(styleLengths.values()) and all(
             [n == l0 for n in propLens]
         ):
-            styleNames = sorted(
-                list(allStyles.keys())
-            )  # Sorted here works because colour comes first!
+            # Sorted here works because colour comes first!
+            styleNames = sorted(allStyles)
             pos = 0
             for (i, p) in enumerate(specificProps):
                 if len(p) == 1:
@@ -311,23 +296,16 @@ def computeStyles(implv, monotone=False):
                 if len(p) == 1:
                     continue
 
-                deltaLen = dict(
-                    [
-                        (
-                            k,
-                            len(allStyles[k]) - len(p)
-                            if (len(allStyles[k]) >= len(p) and not used[k])
-                            else 10000,
-                        )
-                        for k in list(allStyles.keys())
-                    ]
-                )
+                deltaLen = {
+                    k: n - len(p) if (n >= len(p) and not used[k]) else 10000
+                    for (k, n) in styleLengths.items()
+                }
                 # print ("Looking for encoding for " + str(p) + " ["+str(i)+"]")
                 # Find the least wasteful property
                 minDelta = min(deltaLen.values())
                 if minDelta == 10000:
                     continue
-                for k in list(allStyles.keys()):
+                for k in allStyles:
                     if deltaLen[k] == minDelta:
                         bestProp = k
                         break
@@ -344,7 +322,7 @@ def computeStyles(implv, monotone=False):
                 if len(p) == 1:
                     continue
                 used["colours"] = True
-                for k in list(encodingToProperty.keys()):
+                for k in encodingToProperty:
                     if encodingToProperty[k] == i:
                         used[k] = 0
                         break
@@ -356,9 +334,12 @@ def computeStyles(implv, monotone=False):
         # mapping, which ensures that each entry is unique.
         if sum(used.values()) == requiredDimensions:
             # print ("encodingToProperty = ", encodingToProperty)
-            lv = [sorted(list(p), key=cmp_to_key(compareFn)) for p in specificProps]
+            lv = [
+                {v: i for (i, v) in enumerate(sorted(p, key=implKey))}
+                for p in specificProps
+            ]
             for impl in implv:
-                properties = impl.split(",")
+                properties = tokenize(impl)
                 # print ("properties = " + str(properties))
                 res[impl] = (
                     pick(
@@ -375,7 +356,7 @@ def computeStyles(implv, monotone=False):
                 )
             return res
     # Failed to find a good mapping so use the safe default
-    for i, impl in enumerate(sorted(implv, key=cmp_to_key(compareFn))):
+    for i, impl in enumerate(sorted(implv, key=implKey)):
         res[impl] = (pick(styles, i), pick(colours, i), "-")
 
     return res
@@ -404,6 +385,12 @@ def setupXAxis(plot, minVal, maxVal, label, logarithmic):
         plot.set_xlim((0 if minVal == 1 else minVal), maxVal)
 
 
+# We only use a couple of font sizes, so only create their properties once.
+@functools.lru_cache(maxsize=None)
+def legendFont(fontSize):
+    return matplotlib.font_manager.FontProperties(size=fontSize)
+
+
 def addLegend(ax, lines, impls, legendPos):
     """Add the legend to the plot, shrinking the plot slightly to make
     room, since we add the legend outside the plot to the right, or leaving the plot
@@ -417,7 +404,7 @@ def addLegend(ax, lines, impls, legendPos):
         return
     legendItems = len(impls)
     fontSize = 10 if legendLen < 20 and legendItems <= 4 else 8
-    prop = matplotlib.font_manager.FontProperties(size=fontSize)
+    prop = legendFont(fontSize)
     if legendPos in (
         "best",
         "upper right",
@@ -488,16 +475,19 @@ def generatePlot(
     Error bars can be plotted
     """
 
-    print("Plot: '" + bmName + "'")
+    if verbose:
+        print("Plot: '" + bmName + "'")
 
     # For "European" size paper a sqrt(2) aspect ratio is good, since that's
     # the page ratio.
     aspectRatio = math.sqrt(2)
     widthInInches = 6
-    fig = plt.figure(figsize=(widthInInches * aspectRatio, widthInInches), dpi=1200)
+    fig = plt.figure(
+        figsize=(widthInInches * aspectRatio, widthInInches), dpi=plotDpi
+    )
     plt.title(bmName)
     ax = fig.add_subplot(1, 1, 1)
-    impls = sorted(list(sizeValues.keys()), key=cmp_to_key(compareFn))
+    impls = sorted(sizeValues, key=implKey)
     # print("xmMin = ",xMin)
     setupXAxis(ax, npl[0] if xMin == None else xMin, npl[-1], xLabel, logarithmic)
 
@@ -516,23 +506,36 @@ def generatePlot(
             # print "npl : " + str(npl) + " dataValues: " + str(dataValues)
             nplToUse = npl[: len(dataValues)]
         # print "impl: " + str(impl) + " " + str(dataValues)
-        (line,) = ax.plot(nplToUse, dataValues)
-        lines.append(line)
-        plt.setp(
-            line,
+        # Set the line's properties as it is created, rather than updating it afterwards.
+        (line,) = ax.plot(
+            nplToUse,
+            dataValues,
             marker=implementationStyles[impl][0],
-            markerSize=markerSize,
+            markersize=markerSize,
             color=implementationStyles[impl][1],
             linestyle=implementationStyles[impl][2],
         )
+        lines.append(line)
 
         if deviations:
             # ax.errorbar is inconsistent with ax.plot, and doesn't ignore None entries
-            # so we have to add the bars one at a time ignoring the Nones ourself
-            for x, v, e in zip(nplToUse, dataValues, deviations[impl]):
-                if v is None:
-                    continue
-                ax.errorbar(x, v, yerr=e, color=implementationStyles[impl][1])
+            # so we have to remove the Nones ourself, but can then add all the bars at once.
+            points = [
+                (x, v, e)
+                for (x, v, e) in zip(nplToUse, dataValues, deviations[impl])
+                if v is not None and e is not None
+            ]
+            if points:
+                (xs, vs, es) = zip(*points)
+                # Each error is either a scalar, or a [[below], [above]] pair,
+                # so stacking them gives the 1D or (2, n) shape errorbar wants.
+                ax.errorbar(
+                    xs,
+                    vs,
+                    yerr=numpy.hstack(es),
+                    fmt="none",
+                    color=implementationStyles[impl][1],
+                )
     addLegend(ax, lines, impls, legendPos)
     # Round up the yMax value so that it is at the granularity of the y axis tick marks
     yTicks = ax.get_yticks()
@@ -542,7 +545,8 @@ def generatePlot(
         yMax = yTicks[-1]
     else:
         yMax = yTMdelta * math.ceil(yMax / yTMdelta)
-    print("Computed yMax: ", yMax)
+    if verbose:
+        print("Computed yMax: ", yMax)
 
     ax.set_ylim(yMin, yMax)
     # And similarly for xMin
@@ -564,8 +568,6 @@ def generatePlot(
         ax.grid(True)
 
     if "Normalized" in bmName:
-        from matplotlib.ticker import StrMethodFormatter
-
         decimals = 2 if yTMdelta < 0.1 else (1 if yTMdelta < 1.0 else 0)
         ax.yaxis.set_major_formatter(StrMethodFormatter("{x:." + str(decimals) + "f}x"))
         encoding = None
@@ -586,8 +588,6 @@ def generatePlot(
             }.get(yAxisName, None)
     if encoding:
         # print ("Encoding:", encoding)
-        from matplotlib.ticker import EngFormatter
-
         ax.yaxis.set_major_formatter(EngFormatter(unit=encoding[1], sep=""))
         yAxisName = encoding[0]
     # print ("yAxisName:", yAxisName)
@@ -595,7 +595,8 @@ def generatePlot(
 
     fname = cleanFilename(bmName) + fileSuffix
     # Explicitly save the file to the output directory
-    print("Saving " + os.path.join(outputDir, fname + ".png"))
+    if verbose:
+        print("Saving " + os.path.join(outputDir, fname + ".png"))
     fig.savefig(os.path.join(outputDir, fname + ".png"), transparent=True)
     # Can we save eps or pdf? That's what we need for publication, and ... it just works!
     # print("Saving " + os.path.join(outputDir, fname + ".pdf"))
@@ -606,22 +607,12 @@ def generatePlot(
     plt.close()
     fname = fname + ".png"
     # But reference it assuming that the HTML and plot are in the same directory
-    outputHtml("<a href=" + fname + ">")
-
     width = 1000
     height = int(width / aspectRatio)
     outputHtml(
-        "<img src="
-        + fname
-        + " alt="
-        + fname
-        + " width="
-        + str(width)
-        + " height="
-        + str(height)
-        + "/img>"
+        f"<a href={fname}><img src={fname} alt={fname} width={width} height={height}/></a>"
     )
-    outputHtml("</a>")
+    flushHtml()
 
 
 def generateBarChart(bmName, yAxisName, bins, fileSuffix="", xLabel=""):
@@ -641,28 +632,33 @@ def generateBarChart(bmName, yAxisName, bins, fileSuffix="", xLabel=""):
     # Explicitly save the file to the output directory
     fig.savefig(os.path.join(outputDir, fname), transparent=True)
     # But reference it assuming that the HTML and plot are in the same firectory
-    outputHtml("<a href=" + fname + ">")
-    outputHtml("<img src=" + fname + " alt=" + fname + " width=800 height=750/>")
-    outputHtml("</a>")
+    outputHtml(f"<a href={fname}><img src={fname} alt={fname} width=800 height=750/></a>")
+    flushHtml()
+
+
+# Table cell markup
+headerCellStart = "<td align=center>"
+cellStart = "<td align=right>"
+goodCellStart = "<td align=right bgcolor=#99EB99>"
+cellEnd = "</td>"
 
 
 def outputHtmlTableHeader(headers):
-    outputHtml("<tr>")
-    for i in headers:
-        outputHtml("<td align=center>" + i + "</td>")
-    outputHtml("</tr>")
+    outputHtml(
+        "".join(["<tr>"] + [headerCellStart + i + cellEnd for i in headers] + ["</tr>"])
+    )
 
 
 def extractColumnKeys(array):
     """Extract a sorted list of all the second level keys"""
     columnKeys = set()
-    for i in list(array.values()):
+    for i in array.values():
         columnKeys |= set(i.keys())
-    return sorted(list(columnKeys), key=cmp_to_key(compareFn))
+    return sorted(columnKeys, key=implKey)
 
 
 def outputHtmlTitle(text):
-    outputHtml("<h1>" + text + "</h1>")
+    outputHtml(f"<h1>{text}</h1>")
 
 
 def outputHtmlTable(
@@ -697,8 +693,8 @@ def outputHtmlTable(
     outputHtml("<table border=1>")
     outputHtmlTableHeader([leftmostTitle] + [str(k) for k in columnKeys])
     for k in rowKeys:
-        outputHtml("<tr>")
-        outputHtml("<td align=right>" + str(k) + "</td>")
+        # Build the whole row, then output it in one go
+        cells = ["<tr>", cellStart + str(k) + cellEnd]
         allVals = [array[k].get(ck, None) for ck in columnKeys]
         if extremeOp:
             values = [valueFn(v) for v in allVals if v != None and valueFn(v) != None]
@@ -706,23 +702,25 @@ def outputHtmlTable(
             goodMax = extremeVal * deltaOp(1.0, (okPercent / 100.0))
             for v in allVals:
                 if v == None:
-                    outputHtml("<td align=right>  </td>")
+                    cells.append(cellStart + "  " + cellEnd)
                     continue
                 text = formatFn(v)
                 value = valueFn(v)
                 if value == extremeVal:
                     text = '<font color="FF4500">' + text + "</font color></td>"
                 if compareOp(value, goodMax):
-                    outputHtml("<td align=right bgcolor=#99EB99>" + text + "</td>")
+                    cells.append(goodCellStart + text + cellEnd)
                 else:
-                    outputHtml("<td align=right>" + text + "</td>")
+                    cells.append(cellStart + text + cellEnd)
         else:
-            for v in allVals:
-                outputHtml(
-                    "<td align=right>" + (formatFn(v) if v != None else " ") + "</td>"
-                )
-        outputHtml("</tr>")
+            cells += [
+                cellStart + (formatFn(v) if v != None else " ") + cellEnd
+                for v in allVals
+            ]
+        cells.append("</tr>")
+        outputHtml("".join(cells))
     outputHtml("</table><br>")
+    flushHtml()
 
     # Return the name of the column with the last extreme value.
     # In many cases that is the overall mean...
@@ -735,7 +733,7 @@ def mediaWikiTable(leftmostTitle, array, formatFn=lambda x: str(x)):
     print("{|")
     for t in [leftmostTitle] + [str(k) for k in columnKeys]:
         print("!" + " !! ".join(titles))
-    for k in sorted(array.keys, key=cmp_to_key(compareFn)):
+    for k in sorted(array.keys, key=implKey):
         print("|-")
         print("| " + str(k))
         v = array[k]
@@ -749,69 +747,83 @@ def linearFit(title, threadCounts, bestTimes, independentVar, unit):
     """Print info on a linear fit"""
     outputHtml("<h1>" + title + "</h1>")
     results = {}
-    impls = sorted(list(bestTimes.keys()), key=cmp_to_key(compareFn))
+    impls = sorted(bestTimes, key=implKey)
     outputHtml('<table border="1">')
     if independentVar[-1] == "s":
         independentVar = independentVar[:-1]
     outputHtmlTableHeader(
         ["Implementation", "  Tzero  ", "Per " + independentVar + " " + unit]
     )
-    for impl in impls:
-        outputHtml("<tr>")
-        outputHtml("<td align=left>" + impl + "</td>")
-        coeffs = numpy.polyfit(threadCounts, bestTimes[impl], 1)
+    # Fit all of the implementations at once, each is a column of the y values.
+    allCoeffs = (
+        numpy.polyfit(
+            threadCounts, numpy.column_stack([bestTimes[impl] for impl in impls]), 1
+        )
+        if impls
+        else None
+    )
+    for (k, impl) in enumerate(impls):
+        coeffs = allCoeffs[:, k]
         results[impl] = coeffs
-        for i in (1, 0):
-            outputHtml("<td align=right>" + engFormat(coeffs[i]) + "</td>")
-        outputHtml("</tr>")
+        outputHtml(
+            "".join(
+                ["<tr>", "<td align=left>" + impl + cellEnd]
+                + [cellStart + engFormat(coeffs[i]) + cellEnd for i in (1, 0)]
+                + ["</tr>"]
+            )
+        )
     outputHtml("</table><br>")
+    flushHtml()
     return results
 
 
 def plotFit(title, threadCounts, bestTimes, coeffs, independentVar, unit):
     """Plot the data and best fit for implementations that contain the given key"""
     values = {}
-    for impl in sorted(list(bestTimes.keys()), key=cmp_to_key(compareFn)):
+    for impl in sorted(bestTimes, key=implKey):
         values[impl] = bestTimes[impl]
-        (tThread, tZero) = coeffs[impl]
-        values[impl + "(best fit)"] = [
-            tZero + thread * tThread for thread in threadCounts
-        ]
+        values[impl + "(best fit)"] = numpy.polyval(coeffs[impl], threadCounts).tolist()
     generatePlot(
         title, unit, threadCounts, values, xLabel=independentVar, logarithmic=False
     )
 
 
 # Code to read the SI formatted data.
+# These are constant, so build them once, rather than on each call to extractSI.
+siTypes = {"T": "Time", "O": "Rate", "A": "Rate", "s": "Seconds", "%": "Percentage"}
+# http://physics.nist.gov/cuu/Units/prefixes.html
+siFactors = {
+    "Y": 1e24,
+    "Z": 1e21,
+    "E": 1e18,
+    "P": 1e15,
+    "T": 1e12,
+    "G": 1e9,
+    "M": 1e6,
+    "k": 1e3,
+    " ": 1,
+    "m": -1e3,  # Yes, I do mean that, see below for the explanation.
+    "u": -1e6,
+    "n": -1e9,
+    "p": -1e12,
+    "f": -1e15,
+    "a": -1e18,
+    "z": -1e21,
+    "y": -1e24,
+}
+
+
+# The same strings (such as thread counts) recur many times in the input, so cache the results.
+@functools.lru_cache(maxsize=65536)
 def extractSI(s):
     """Convert a measurement with a range suffix into a suitably scaled value"""
-    types = {"T": "Time", "O": "Rate", "A": "Rate", "s": "Seconds", "%": "Percentage"}
     du = s.split()
     num = float(du[0])
     units = du[1] if len(du) == 2 else " "
     if s[-1] == " ":
         units = units + " "
 
-    # http://physics.nist.gov/cuu/Units/prefixes.html
-    factor = {
-        "Y": 1e24,
-        "Z": 1e21,
-        "E": 1e18,
-        "P": 1e15,
-        "T": 1e12,
-        "G": 1e9,
-        "M": 1e6,
-        "k": 1e3,
-        " ": 1,
-        "m": -1e3,  # Yes, I do mean that, see below for the explanation.
-        "u": -1e6,
-        "n": -1e9,
-        "p": -1e12,
-        "f": -1e15,
-        "a": -1e18,
-        "z": -1e21,
-        "y": -1e24,
-    }[units[0] if len(units) == 2 else " "]
+    factor = siFactors[units[0] if len(units) == 2 else " "]
     # print ("units = '" + units + "'" + " factor=" + str(factor))
 
     # Minor trickery here is an attempt to preserve accuracy by using a single divide,
@@ -821,12 +833,15 @@ def extractSI(s):
     # at most five decimal digits of precision).
     return (
         num * factor if factor > 0 else num / -factor,
-        types.get(units[-1], "Count"),
+        siTypes.get(units[-1], "Count"),
     )
 
 
 def readData(f):
     """Load data into a Pandas' data frame, we're not using this yet..."""
+    # Only this needs pandas, so don't make everyone install it.
+    import pandas as pd
+
     line = f.readline()
     fieldnames = [x.strip() for x in line.split(",")]
     line = f.readline().strip()
@@ -836,43 +851,45 @@ def readData(f):
             fields = line.split(",")
             data.append((fields[0], [extractSI(v)[0] for v in fields[1:]]))
         line = f.readline().strip()
-    # Man, working out this next incantation out was non-trivial!
-    # They really want you to be snarfing data in csv or some other format they understand!
-    res = pd.DataFrame.from_items(data, columns=fieldnames[1:], orient="index")
+    # DataFrame.from_items has been removed from pandas, from_dict does the same job.
+    res = pd.DataFrame.from_dict(dict(data), orient="index", columns=fieldnames[1:])
     return res
 
 
+minutesSecondsRe = re.compile(r"([0-9]+)m +([0-9]+\.[0-9]+)s")
+secondsRe = re.compile(r"([0-9]+\.[0-9]+)s")
+
+
 def extractTime(s):
     """Extract a time from a string of the form "%dm %4.2fs"
     which is what "time" generates.
     """
-    msRe = r"([0-9]+)m +([0-9]+\.[0-9]+)s"
-    matched = re.match(msRe, s)
+    matched = minutesSecondsRe.match(s)
     if matched:
         return 60 * int(matched.group(1)) + float(matched.group(2))
     # Maybe we don't have any minutes
-    sRe = r"([0-9]+\.[0-9]+)s"
-    matched = re.match(sRe, s)
+    matched = secondsRe.match(s)
     if matched:
         return float(matched.group(1))
 
 
+# Scale factors and exponent suffixes for the engineering format exponents we expect to see
+engScales = {e: (10.0 ** -e, "" if e == 0 else "e%d" % e) for e in range(-30, 31, 3)}
+
+
 def engFormat(f):
     """Format a number in engineering format, where the exponent is a multiple of 3"""
     if f == 0.0:
         value = 0.0
-        exponent = 0
+        suffix = ""
     else:
-        exponent = math.log10(-f if f < 0 else f)
-        if exponent < 0:
-            exponent = -int(math.ceil(-exponent))
-        else:
-            exponent = int(math.floor(exponent))
-        for i in range(3):
-            if (exponent % 3) == 0:
-                break
-            exponent = exponent - 1
-        value = f * 10 ** -exponent
+        # Round the decimal exponent down to a multiple of 3
+        exponent = 3 * (math.floor(math.log10(math.fabs(f))) // 3)
+        (scale, suffix) = engScales.get(exponent) or (
+            10.0 ** -exponent,
+            "e%d" % exponent,
+        )
+        value = f * scale
     # Choose a format to maintain the number of useful digits we print.
     if abs(value) < 10:
         fmt = "%6.3f%s"
@@ -881,7 +898,7 @@ def engFormat(f):
     else:
         fmt = "%6.1f%s"
 
-    return fmt % (value, ("" if exponent == 0 else "e%d" % exponent))
+    return fmt % (value, suffix)
 
 
 class measurement:
@@ -920,81 +937,91 @@ class measurement:
         self.rememberUnit(name, unit)
 
     def getValue(self, name):
-        return self.__dict__.get(name, None)
+        return getattr(self, name, None)
 
     def formatValue(self, name):
         value = self.getValue(name)
         return "None" if value == None else measurement.formatFunctions[name](value)
 
+    @staticmethod
+    def valueFormatter(name):
+        """Return a function which formats the named value of a measurement,
+        looking up the format function once, rather than for every value"""
+        formatFn = measurement.formatFunctions[name]
+
+        def formatValue(m):
+            value = getattr(m, name, None)
+            return "None" if value == None else formatFn(value)
+
+        return formatValue
+
 
 def findAllStats():
-    return set([x for x in list(measurement.units.keys()) if not "SD" in x])
+    # The standard deviation of the mean is just "SD", the others are "<stat>_SD"
+    return {x for x in measurement.units if x != "SD" and not x.endswith("_SD")}
 
 
 def convertMinMaxIntoError(m, name, minName, maxName):
     """If a measurement has Min and Max, we can convert them into a notional error bar
     by replacing the name_SD field with a [minName-value, maxName-value] pair"""
-    minVal = m.__dict__.get(minName, None)
-    maxVal = m.__dict__.get(maxName, None)
+    minVal = getattr(m, minName, None)
+    maxVal = getattr(m, maxName, None)
     if maxVal == None or minVal == None:
         return None
-    value = m.__dict__[name]
+    value = getattr(m, name)
     return [[value - minVal], [maxVal - value]]
 
 
-def summarizeResults(results, what, discard=(), minName=None, maxName=None):
-    """Extract a list of thread counts,
-    The times per benchmark/thread, and standard deviations per benchmark/thread"""
-    #    threadCounts = sorted (transpose(results).keys())
-    threadCounts = sorted(
-        [t for t in list(transpose(results).keys()) if t not in discard]
-    )
-    sds = {}
-    meanValues = {}
-    what_SD = "SD" if what == "Mean" else what + "_SD"
-
-    for k in list(results.keys()):
-        res = results[k]
-        meanValues[k] = [
-            None if res.get(tc, None) == None else res[tc].__dict__.get(what, None)
-            for tc in threadCounts
-        ]
-        if minName != None and maxName != None:
-            sds[k] = [
-                None
-                if res.get(tc, None) == None
-                else convertMinMaxIntoError(res[tc], what, minName, maxName)
-                for tc in threadCounts
-            ]
-        else:
-            sds[k] = [
-                None
-                if res.get(tc, None) == None
-                else res[tc].__dict__.get(what_SD, None)
-                for tc in threadCounts
+def summarizeAllResults(
+    results, whats, discard=(), minName=None, maxName=None, transposed=None
+):
+    """Extract the thread counts, and the values and standard deviations per
+    benchmark/thread for each of the statistics in whats, in a single pass over the results.
+    Returns a dictionary mapping each statistic to its (threadCounts, values, sds).
+    If the caller already has transpose(results) it can pass it in as transposed."""
+    if transposed is None:
+        transposed = transpose(results)
+    threadCounts = sorted([t for t in transposed if t not in discard])
+    summaries = {what: (threadCounts, {}, {}) for what in whats}
+
+    for (k, res) in results.items():
+        # Look up this implementation's measurements once, then extract the columns we want from them.
+        row = [res.get(tc, None) for tc in threadCounts]
+        for what in whats:
+            (_, meanValues, sds) = summaries[what]
+            meanValues[k] = [
+                None if m == None else getattr(m, what, None) for m in row
             ]
-    return (threadCounts, meanValues, sds)
+            if minName != None and maxName != None:
+                sds[k] = [
+                    None
+                    if m == None
+                    else convertMinMaxIntoError(m, what, minName, maxName)
+                    for m in row
+                ]
+            else:
+                what_SD = "SD" if what == "Mean" else what + "_SD"
+                sds[k] = [
+                    None if m == None else getattr(m, what_SD, None) for m in row
+                ]
+    return summaries
 
 
-def selectedT1(results, what, doMin=True):
+def selectedT1(results, what, doMin=True, transposed=None):
     """Extract a minimum or maximum value for the given key on the fewest number of threads we measured on (anywhere)"""
-    selectedCount = min(
-        [k for k in transpose(results).keys() if not isinstance(k, str)]
-    )
-    selectedVal = 1e9 if doMin else -1e9
+    if transposed is None:
+        transposed = transpose(results)
+    selectedCount = min(k for k in transposed if not isinstance(k, str))
 
     # print "selectedCount " + str(selectedCount)
 
-    comparison = min if doMin else max
-    for k in list(results.keys()):
-        res = results[k]
-        thisVal = (
-            None
-            if res.get(selectedCount, None) == None
-            else res[selectedCount].__dict__.get(what, None)
-        )
-        if thisVal != None:
-            selectedVal = comparison(selectedVal, thisVal)
+    # Gather the values from every implementation which has one for that count,
+    # along with the default should there be none.
+    candidates = [getattr(m, what, None) for m in transposed[selectedCount].values()]
+    values = numpy.array(
+        [1e9 if doMin else -1e9] + [v for v in candidates if v != None]
+    )
+    selectedVal = float(values.min() if doMin else values.max())
     if selectedCount != 1:
         print("Using time for " + str(selectedCount) + " threads as scale basis")
     if doMin:
@@ -1004,11 +1031,16 @@ def selectedT1(results, what, doMin=True):
 
 
 def transformResults(threadCounts, values, function):
+    """Apply function(value, threadCount) to each value, leaving missing (None) values alone.
+    The functions are simple arithmetic, so we apply them to whole arrays at once,
+    using NaN to stand in for the missing values."""
+    nThreads = numpy.array(threadCounts, dtype=float)
     res = {}
-    for bm in list(values.keys()):
-        res[bm] = []
-        for (nThreads, v) in zip(threadCounts, values[bm]):
-            res[bm].append(None if v == None else function(v, nThreads))
+    for (bm, bmValues) in values.items():
+        v = numpy.array([numpy.nan if x == None else x for x in bmValues], dtype=float)
+        n = min(len(v), len(nThreads))
+        transformed = function(v[:n], nThreads[:n])
+        res[bm] = [None if math.isnan(x) else x for x in transformed.tolist()]
     return res
 
 
@@ -1016,32 +1048,34 @@ def computeStats(results, independentVariable):
     """Compute mean and standard deviation results for duplicate entries
        in the list of measurements.
     """
-    common = {}
+    common = collections.defaultdict(list)
 
     # Collect lists of the values
     for v in results:
-        test = v.__dict__[independentVariable]
-        try:
-            common[test].append(v)
-        except:
-            common[test] = [v]
+        common[getattr(v, independentVariable)].append(v)
 
     result = []
     # Sanity check for number of data items being summarized
     # print "Computing stats on " + str(len(common.values()[0]))
-    for measurements in list(common.values()):
+    for measurements in common.values():
         resultValues = {}
-        resultValues[independentVariable] = measurements[0].__dict__[
-            independentVariable
-        ]
+        resultValues[independentVariable] = getattr(
+            measurements[0], independentVariable
+        )
         fieldnames = list(measurements[0].__dict__.keys())
         fieldnames.remove(independentVariable)
-        for stat in fieldnames:
-            values = [m.__dict__[stat] for m in measurements]
-            resultValues[stat] = mean(values)
-            resultValues[stat + "_SD"] = standardDeviation(values, resultValues[stat])
+        # Each row is one measurement, each column a field, so we can
+        # compute the statistics for all the fields at once.
+        values = numpy.array(
+            [[getattr(m, stat) for stat in fieldnames] for m in measurements]
+        )
+        means = values.mean(axis=0)
+        sds = values.std(axis=0)
+        for (i, stat) in enumerate(fieldnames):
+            resultValues[stat] = float(means[i])
+            resultValues[stat + "_SD"] = float(sds[i])
         result.append(
-            measurement(list(resultValues.keys()), list(resultValues.values()))
+            measurement(resultValues.keys(), resultValues.values())
         )
 
     return result
@@ -1052,18 +1086,16 @@ def needStat(title, stat):
 
 
 # Match a statistic output by "perf -e "
-perfOutputLineRe = re.compile("^\s*([0-9,]+)\s([a-zA-Z0-9\-]+)\s*$")
+perfOutputLineRe = re.compile(r"^\s*([0-9,]+)\s([a-zA-Z0-9\-]+)\s*$")
 
 
 def computeSelection(fields, desiredFields):
     # Ensure that the order of the fields selected is the same as the order in the desiredFields list.
-    res = []
-    for df in desiredFields:
-        for (idx, f) in enumerate(fields):
-            if f == df:
-                res.append(idx)
-                break
-    return res
+    # If a field name is repeated, we want the first one.
+    fieldIndex = {}
+    for (idx, f) in enumerate(fields):
+        fieldIndex.setdefault(f, idx)
+    return [fieldIndex[df] for df in desiredFields if df in fieldIndex]
 
 
 def addOverallMeans(results, fieldNames, fields):
@@ -1071,11 +1103,16 @@ def addOverallMeans(results, fieldNames, fields):
     # Work out what the values we already have look like
     meanValues = ["Overall Mean"]
     geoMeanValues = ["Overall Geometric Mean"]
+    # Gather all the values into one array, with a column for each field.
+    names = [name for name in fieldNames[1:] if name in fields]
+    values = numpy.array(
+        [[getattr(r, name) for name in names] for r in results], dtype=float
+    ).reshape(len(results), len(names))
+    columns = dict(zip(names, values.T))
     for name in fieldNames[1:]:
         if name in fields:
-            values = [r.__dict__[name] for r in results]
-            geoMeanValues.append(geomean(values))
-            meanValues.append(mean(values))
+            geoMeanValues.append(geomean(columns[name]))
+            meanValues.append(mean(columns[name]))
         else:
             geoMeanValues.append(0)
             meanValues.append(0)
@@ -1085,46 +1122,51 @@ def addOverallMeans(results, fieldNames, fields):
     return results
 
 
+# The "nice" values (between 1 and 10) which we're happy to use as the top of the Y axis.
+goodMaxSteps = (
+    1.0,
+    1.1,
+    1.2,
+    1.25,
+    1.3,
+    1.4,
+    1.5,
+    1.6,
+    1.7,
+    1.75,
+    1.8,
+    1.9,
+    2.0,
+    2.5,
+    3.0,
+    4.0,
+    5.0,
+    6.0,
+    7.0,
+    7.5,
+    8.0,
+    9.0,
+)
+
+
 def computeGoodMax(totalTimes, noerrs):
     """Find a good value for the maximum on the Y axis"""
     # Could allow a small amount of space above the top, but it's annnoying for percentages!
     # return None
     factor = 1.00
     maxReading = factor * max(
-        [max([v for v in l if v != None]) for l in list(totalTimes.values())]
+        max(v for v in l if v != None) for l in totalTimes.values()
     )
     if maxReading == 0:
         maxReading = 0.1
     decade = math.floor(math.log10(maxReading))
     scaledValue = maxReading * 10 ** (-decade)
     # print ("maxReading: ",maxReading,"decade: ",decade," scaledValue: ",scaledValue)
-    for v in (
-        1.0,
-        1.1,
-        1.2,
-        1.25,
-        1.3,
-        1.4,
-        1.5,
-        1.6,
-        1.7,
-        1.75,
-        1.8,
-        1.9,
-        2.0,
-        2.5,
-        3.0,
-        4.0,
-        5.0,
-        6.0,
-        7.0,
-        7.5,
-        8.0,
-        9.0,
-    ):
-        if scaledValue <= v:
-            # print ("computeGoodMax: ", v * (10**decade))
-            return v * (10 ** decade)
+    # Find the first step which is at least as large as the scaled value
+    i = bisect.bisect_left(goodMaxSteps, scaledValue)
+    if i < len(goodMaxSteps):
+        # print ("computeGoodMax: ", goodMaxSteps[i] * (10**decade))
+        return goodMaxSteps[i] * (10 ** decade)
     # print ("computeGoodMax: ", 10**(decade+1))
     return 10 ** (decade + 1)
 
@@ -1166,27 +1208,31 @@ def readFile(fname, desiredFields, minX, maxX):
         selectedFields = computeSelection(fieldnames, desiredFields)
         # print ("selectedFields: " + str(fieldnames))
 
-        results = []
-        for line in f:
-            line = line[:-1]
-            if (not line) or line[0] == "#":
-                continue  # Ignore blank lines and comments
-            else:
-                data = line.split(",")
-                try:
-                    data = [data[i] for i in selectedFields]
-                    # We don't actually have times, but this should still be OK
-                    (values, units) = list(zip(*[extractSI(x) for x in data]))
-                except:
-                    print("*** " + line)
-                    continue
-                # print "maxX:", maxX, "Values[0] ", values[0]
-                if values[0] > maxX or values[0] < minX:
-                    # print ("Ignoring ", values[0], " since it's out of range (",minX,":",maxX,")")
-                    continue
-                values = [values[0]] + [x / scaleFactor for x in values[1:]]
-                stat = measurement(desiredFields, values, units)
-                results += [stat]
+        # Read the rest of the file in one go, ignoring blank lines and comments
+        lines = [line for line in f.read().splitlines() if line and line[0] != "#"]
+
+    # itemgetter with a single index returns the item itself, rather than a tuple
+    pickFields = (
+        operator.itemgetter(*selectedFields)
+        if len(selectedFields) > 1
+        else lambda row: (row[selectedFields[0]],)
+    )
+    results = []
+    for line in lines:
+        try:
+            data = pickFields(line.split(","))
+            # We don't actually have times, but this should still be OK
+            (values, units) = list(zip(*[extractSI(x) for x in data]))
+        except:
+            print("*** " + line)
+            continue
+        # print "maxX:", maxX, "Values[0] ", values[0]
+        if values[0] > maxX or values[0] < minX:
+            # print ("Ignoring ", values[0], " since it's out of range (",minX,":",maxX,")")
+            continue
+        values = [values[0]] + [x / scaleFactor for x in values[1:]]
+        stat = measurement(desiredFields, values, units)
+        results += [stat]
 
     if not any(["SD" in x for x in desiredFields]):
         results = computeStats(results, independentVariable)
@@ -1200,7 +1246,7 @@ def readFile(fname, desiredFields, minX, maxX):
     # Convert the list into a hash by the name of the first column
     byThread = {}
     for v in results:
-        byThread[v.__dict__[independentVariable]] = v
+        byThread[getattr(v, independentVariable)] = v
 
     return (title, independentVariable, l, byThread)
 
@@ -1213,46 +1259,39 @@ def normalizeResults(results, independentVariable, basis):
        since then results which were smaller can look larger when compared
        with others for the same processor where the min was different but the 
        range larger."""
-    normValues = {}
-    if basis == "min":
-        reduction = min
-    elif basis == "mean":
-        reduction = mean
-    elif basis == "max":
-        reduction = max
+    reduction = {"min": numpy.min, "mean": mean, "max": numpy.max}[basis]
 
     print("Normalising by " + basis)
-    for k in results.keys():
-        ik = k.split(",")[0]
-        if ik not in normValues.keys():
-            normValues[ik] = []
-        values = []
-        for iv in results[k].keys():
-            values += [results[k][iv].__dict__["Mean"]]
-        normValues[ik] += values
+    # Gather the means for each micro-architecture (the first field of the name)
+    normValues = collections.defaultdict(list)
+    for (k, experiment) in results.items():
+        normValues[k.split(",")[0]].append(
+            numpy.array([line.Mean for line in experiment.values()])
+        )
     for ik in normValues.keys():
-        normValues[ik] = reduction(normValues[ik])
+        normValues[ik] = float(reduction(numpy.concatenate(normValues[ik])))
 
     # And now scale everything
-    for k in results.keys():
-        ik = k.split(",")[0]
-        norm = normValues[ik]
-        experiment = results[k]
+    for (k, experiment) in results.items():
+        norm = normValues[k.split(",")[0]]
         for line in experiment.values():
-            for value in line.__dict__.keys():
-                if value == independentVariable:
-                    continue
-                line.__dict__[value] = line.__dict__[value] / norm
+            fields = [f for f in line.__dict__ if f != independentVariable]
+            scaled = numpy.array([line.__dict__[f] for f in fields]) / norm
+            line.__dict__.update(zip(fields, scaled.tolist()))
 
 
 def highIsBest(metric):
     return "Highest" if ((metric == "rate") or (metric == "speedup")) else "Lowest"
 
 
+badFilenameCharsRe = re.compile("[ _\n\t/()*,&:;@.]+")
+trailingUnderscoreRe = re.compile("_$")
+
+
 def cleanFilename(fname):
     """Turn runs of bad characters to have in a filename into a single underscore,
     remove any trailing underscore"""
-    return re.sub("_$", "", re.sub("[ _\n\t/()*,&:;@.]+", "_", fname))
+    return trailingUnderscoreRe.sub("", badFilenameCharsRe.sub("_", fname))
 
 
 def generateReport():
@@ -1274,9 +1313,7 @@ def generateReport():
         "Maximum Serial",
     )
 
-    from optparse import OptionParser
-
-    global outputDir, htmlFile, implementationStyles
+    global outputDir, htmlFile, implementationStyles, verbose, plotDpi
 
     options = OptionParser()
     options.add_option(
@@ -1401,8 +1438,25 @@ def generateReport():
         default="best",
         help="Place the legend, by default 'best', 'below' or 'right' are out of the plot, other values as in matplotlib documentation",
     )
+    options.add_option(
+        "--dpi",
+        action="store",
+        type="int",
+        dest="dpi",
+        default=plotDpi,
+        help="Resolution of the plots in dots per inch (use 1200 for publication quality)",
+    )
+    options.add_option(
+        "--verbose",
+        action="store_true",
+        dest="verbose",
+        default=False,
+        help="Report progress on each plot",
+    )
     (options, args) = options.parse_args()
 
+    verbose = options.verbose
+    plotDpi = options.dpi
     maxX = options.maxX
     minX = options.minX
     forceMinY = not options.noMinY
@@ -1478,11 +1532,11 @@ def generateReport():
         results[implementation] = res
         sys.stdout.flush()
 
-    if len(list(measurement.units.keys())) == 0:
+    if not measurement.units:
         print("No data read")
         return
 
-    print("Read " + ",".join(list(measurement.units.keys())))
+    print("Read " + ",".join(measurement.units))
 
     if options.normalize:
         title = "Normalized " + title
@@ -1533,6 +1587,15 @@ def generateReport():
             "Number",
             "Maximum Serial",
         )
+    # Extract the values for all the statistics we're going to plot in one go
+    summaries = summarizeAllResults(
+        results,
+        [stat for stat in stats if stat in allStats],
+        discard=("Overall Geometric Mean", "Overall Mean"),
+        minName=minName,
+        maxName=maxName,
+        transposed=transposedResults,
+    )
     for stat in stats:
         if stat not in allStats:
             # print "Cannot report on " + stat + ": available stats are " + (", ".join(allStats))
@@ -1545,8 +1608,8 @@ def generateReport():
         bestCol = outputHtmlTable(
             independentVariable,
             transposedResults,
-            lambda x: x.formatValue(stat),
-            lambda x: x.getValue(stat),
+            measurement.valueFormatter(stat),
+            lambda x: getattr(x, stat, None),
             highIsBest(metric),
             okPercent=okPercent,
         )
@@ -1557,13 +1620,7 @@ def generateReport():
         if bestCol:
             outputHtml(" Best : '" + bestCol + "'<br>")
 
-        (threadCounts, totalTimes, totalSds) = summarizeResults(
-            results,
-            stat,
-            discard=("Overall Geometric Mean", "Overall Mean"),
-            minName=minName,
-            maxName=maxName,
-        )
+        (threadCounts, totalTimes, totalSds) = summaries[stat]
         # print ("threadCounts: ",threadCounts)
         # print(stat + ": Units " + measurement.units[stat])
         (unit, timeUnit) = {
@@ -1598,7 +1655,7 @@ def generateReport():
 
         # print("Title: '" + title + "'")
 
-        numLines = len(list(totalTimes.keys()))
+        numLines = len(totalTimes)
         legendPos = options.legendPos
         generatePlot(
             (title + " " + stat) if needStat(title, stat) else title,
@@ -1678,7 +1735,9 @@ def generateReport():
         if wantSpeedups:
             # Compute speedup and parallel efficiencies relative to the fastest one thread time or rate
 
-            (bestT1, threadCount) = selectedT1(results, stat, metric == "time")
+            (bestT1, threadCount) = selectedT1(
+                results, stat, metric == "time", transposed=transposedResults
+            )
             speedupFunctions = {
                 "time": lambda x, nt: bestT1 / x,
                 "rate": lambda x, nt: x / bestT1,
@@ -1733,6 +1792,7 @@ def generateReport():
             )
 
     outputHtml("</body> </html>")
+    flushHtml()
     htmlFile.close()
 
 
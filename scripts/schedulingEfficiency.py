@@ -11,17 +11,32 @@
 #
 
 
+import sys
+import numpy
+
+
 def efficiency(iterations, nthreads):
     """Compute the efficiency"""
-    baseIterationsPerThread = iterations // nthreads
-    remainder = iterations - baseIterationsPerThread * nthreads
-    totalAvailable = nthreads * (baseIterationsPerThread + (1 if remainder != 0 else 0))
-    return float(iterations) / totalAvailable
+    # Each thread gets the ceiling of iterations/nthreads, (-(-a // b) is ceil(a/b)).
+    return iterations / (nthreads * -(-iterations // nthreads))
+
+
+def efficiencyTable(maxIterations, maxThreads):
+    """Compute the efficiency for 1..maxIterations iterations on each of
+    1..maxThreads threads, indexed by [threads-1, iterations-1] so that the
+    sweep for each thread count is a contiguous row"""
+    threads = numpy.arange(1, maxThreads + 1).reshape(-1, 1)
+    iterations = numpy.arange(1, maxIterations + 1)
+    return efficiency(iterations, threads)
 
 
-print("Theoretical Static Scheduling Efficiency")
 nThreads = 10
-print(nThreads, " threads")
-print("n (number of chunks of work),      Efficiency")
-for iterations in range(1, 101):
-    print(iterations, ",", efficiency(iterations, nThreads) * 100, "%")
+efficiencies = efficiencyTable(100, nThreads)[nThreads - 1] * 100
+# Format the whole table and write it in one go.
+out = [
+    "Theoretical Static Scheduling Efficiency\n",
+    f"{nThreads}  threads\n",
+    "n (number of chunks of work),      Efficiency\n",
+]
+out += [f"{i} , {e} %\n" for (i, e) in enumerate(efficiencies.tolist(), 1)]
+sys.stdout.write("".join(out))
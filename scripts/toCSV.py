@@ -9,42 +9,52 @@
 #
 # Convert a file to CSV format, expanding units
 
+import re
 import sys
 
 
-def convertSI(s):
+# The exponent for each SI prefix, which doesn't change so is only built once.
+# http://physics.nist.gov/cuu/Units/prefixes.html
+siExponents = {
+    "Y": "e24",
+    "Z": "e21",
+    "E": "e18",
+    "P": "e15",
+    "T": "e12",
+    "G": "e9",
+    "M": "e6",
+    "k": "e3",
+    "m": "e-3",
+    "u": "e-6",
+    "n": "e-9",
+    "p": "e-12",
+    "f": "e-15",
+    "a": "e-18",
+    "z": "e-21",
+    "y": "e-24",
+}
+
+
+# A comma, and the field after it if that is a number followed by units,
+# allowing for the whitespace around them (and the newline at the end of the line).
+# Only the first character of the units (the SI prefix) is captured.
+# Any other field is left as it is.
+measurementRe = re.compile(r",(?:\s*([^\s,]+)\s+([^\s,])[^\s,]*\s*(?=,|$))?")
+
+
+def convertSI(m):
     """Convert a measurement with a range suffix into a suitably scaled value"""
-    du = s.split()
-    if len(du) != 2:
-        return s
-    units = du[1] if len(du) == 2 else " "
-    # http://physics.nist.gov/cuu/Units/prefixes.html
-    factor = {
-        "Y": "e24",
-        "Z": "e21",
-        "E": "e18",
-        "P": "e15",
-        "T": "e12",
-        "G": "e9",
-        "M": "e6",
-        "k": "e3",
-        " ": "",
-        "m": "e-3",
-        "u": "e-6",
-        "n": "e-9",
-        "p": "e-12",
-        "f": "e-15",
-        "a": "e-18",
-        "z": "e-21",
-        "y": "e-24",
-    }[units[0]]
-    return du[0] + factor
-
-
-for line in sys.stdin:
-    if "," in line:
-        items = line.split(",")
-        # Don't do anything with the first column
-        print(", ".join([items[0]] + [convertSI(s) for s in items[1:]]))
-    else:
-        print(line, end="")
+    (value, prefix) = m.groups()
+    if value is None:
+        return ", "
+    return ", " + value + siExponents[prefix]
+
+
+# Read all of the input, convert it, and write it all back in one go.
+# Don't do anything with the first column, or with lines without any commas.
+sys.stdout.write(
+    "".join(
+        measurementRe.sub(convertSI, line) + "\n" if "," in line else line
+        for line in sys.stdin.readlines()
+    )
+)
@@ -16,16 +16,42 @@
 import subprocess
 import platform
 import os
+import sys
+import concurrent.futures
+from optparse import OptionParser
 
 # Work around weird MacOS behaviour (maybe security related?)
 # The DYLD_LIBRARY_PATH is *not* passed on to a grandchild process
 # by default, so we have to pass it explicitly.
 dyldPath = os.getenv("DYLD_LIBRARY_PATH")
-env = "" if not dyldPath else "DYLD_LIBRARY_PATH="+dyldPath
+env = {} if not dyldPath else {"DYLD_LIBRARY_PATH": dyldPath}
+# Copy our environment once; each test only adds to it.
+baseEnv = dict(os.environ, **env)
 
-def execute(cmd):
-    print ("Running " + cmd)
-    subprocess.run(cmd, shell=True)
+def execute(image, extraEnv):
+    """Run image, without a shell, with extraEnv added to its environment.
+    Its output is captured rather than printed, so that the output of tests
+    which run at the same time doesn't get mixed up"""
+    try:
+        return subprocess.run([image], env=dict(baseEnv, **extraEnv), capture_output=True)
+    except OSError as e:
+        # For instance the test hasn't been built; report it as a failure like
+        # the shell would (exit code 127), and carry on with the other tests.
+        return subprocess.CompletedProcess([image], 127, b"", (str(e) + "\n").encode())
+
+def report(image, extraEnv, result):
+    """Print what was run and the output from it.
+    Return whether it succeeded"""
+    envString = "".join(k + "=" + v + " " for (k, v) in extraEnv.items())
+    print("Running " + envString + image, flush=True)
+    sys.stdout.buffer.write(result.stdout)
+    sys.stdout.buffer.flush()
+    sys.stderr.buffer.write(result.stderr)
+    sys.stderr.buffer.flush()
+    if result.returncode != 0:
+        print("*** " + envString + image + " failed, exit code " + str(result.returncode),
+              flush=True)
+    return result.returncode == 0
 
 arch = platform.machine()
 def getExecutable(image):    
@@ -33,11 +59,35 @@ def getExecutable(image):
 
 image = getExecutable("test_locks")
 
-# The list of locks to be tested    
-locks = ["TTAS","MCS","cxx","pthread"]
-if arch == "x86_64":
-    locks += ("speculative",)
+# The locks to be tested, which depend on the architecture
+commonLocks = ("TTAS","MCS","cxx","pthread")
+archLocks = {"x86_64": commonLocks + ("speculative",)}
+locks = archLocks.get(arch, commonLocks)
+
+options = OptionParser()
+options.add_option(
+    "--parallel",
+    action="store_true",
+    dest="parallel",
+    default=False,
+    help="Run the tests for the different locks at the same time, sharing the cores between them",
+)
+(options, args) = options.parse_args()
+
+envs = [dict(LOMP_LOCK_KIND=lock, **env) for lock in locks]
+if not options.parallel:
+    # Each test uses every core, and spinning locks behave badly if their
+    # threads are descheduled, so by default run the tests one at a time.
+    results = map(lambda e: execute(image, e), envs)
+    failures = [not report(image, e, result) for (e, result) in zip(envs, results)]
+else:
+    # Give each test its share of the cores, so that together they don't
+    # oversubscribe the machine, and print their output in order.
+    threads = str(max(1, os.cpu_count() // len(envs)))
+    envs = [dict(e, OMP_NUM_THREADS=threads) for e in envs]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(envs)) as executor:
+        results = executor.map(lambda e: execute(image, e), envs)
+        failures = [not report(image, e, result) for (e, result) in zip(envs, results)]
 
-for lock in locks:
-    execute("LOMP_LOCK_KIND=" + lock + " " + env + " " + image)
-    
+if any(failures):
+    sys.exit(1)